@@ -4,17 +4,73 @@ Analyze experimental results from robomimic experiments.
 Creates a summary CSV with aggregated statistics across all environments and methods.
 """
 
+import argparse
+import csv
+import fnmatch
 import os
+import functools
+from datetime import datetime
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import re
-from typing import Dict, List, Tuple
+import sys
+from typing import Dict, Iterator, List, Tuple
 
+# columns consumed from each rollout CSV (see run_trained_agent.py), all of them are
+# written as integers so they are loaded with a single fixed dtype
+CSV_COLUMNS = ['success', 'n_steps', 'critical_collisions']
+CSV_DTYPE = np.int32
+
+# statistics computed for each CSV file by analyze_csv_file
+STAT_KEYS = [
+    'n_runs',
+    'success_rate',
+    'mean_steps',
+    'total_critical_collisions',
+    'mean_critical_collisions',
+]
+
+# fixed (non-parameter) columns of the result entry built for each CSV file
+RESULT_COLUMNS = [
+    'Environment',
+    'Method_Dir',
+    'Method',
+    'Horizon',
+    'Success_Rate',
+    'N_Critical_Collisions',
+    'Mean_Critical_Collisions',
+    'N_Runs',
+]
+
+# statistics reported per environment and per method at the end of the analysis
+SUMMARY_AGGREGATIONS = {
+    'Success_Rate': ['count', 'mean', 'std'],
+    'Horizon': ['mean', 'std'],
+    'N_Critical_Collisions': ['mean', 'std'],
+}
+
+# result columns with few distinct values, stored as categoricals in the summary
+CATEGORICAL_COLUMNS = ['Environment', 'Method_Dir', 'Method']
+
+# default name of the per-file statistics cache, stored in the results directory
+CACHE_FILENAME = "experiment_cache.csv"
+
+# number of summary rows printed at the end unless --print_all is passed
+N_PREVIEW_ROWS = 20
+
+# parameter tokens in experiment filenames, e.g. Ta8 -> (Ta, 8)
+_PARAM_RE = re.compile(r'([A-Za-z]+)(\d+)')
+
+@functools.lru_cache(maxsize=4096)
 def parse_method_from_filename(filename: str) -> Tuple[str, Dict[str, str]]:
     """
     Parse method name and parameters from filename.
     Examples: PFL_Ta8_cf20.csv -> method=PFL, params={Ta: 8, cf: 20}
+
+    Results are cached since the same filenames recur across environments and method
+    directories, so the returned params dict must not be modified by callers.
     """
     base_name = filename.replace('.csv', '')
     
@@ -26,107 +82,246 @@ def parse_method_from_filename(filename: str) -> Tuple[str, Dict[str, str]]:
     params = {}
     for part in parts[1:]:
         # Extract parameter name and value (e.g., Ta8 -> Ta: 8)
-        match = re.match(r'([A-Za-z]+)(\d+)', part)
+        match = _PARAM_RE.match(part)
         if match:
             param_name, param_value = match.groups()
             params[param_name] = param_value
     
     return method, params
 
+def reduce_runs(data: np.ndarray) -> Dict:
+    """
+    Compute the summary statistics of one experiment from the raw per-run data, an
+    (n_runs, len(CSV_COLUMNS)) integer array. All statistics are derived from a single
+    column-wise sum, which avoids the pandas overhead that dominates for the small CSV
+    files written per experiment.
+    """
+    n_runs = data.shape[0]
+    n_success, total_steps, total_critical_collisions = data.sum(axis=0, dtype=np.int64)
+    return {
+        'n_runs': n_runs,
+        'success_rate': n_success / n_runs,
+        'mean_steps': total_steps / n_runs,
+        'total_critical_collisions': total_critical_collisions,
+        'mean_critical_collisions': total_critical_collisions / n_runs
+    }
+
+@functools.lru_cache(maxsize=16)
+def _csv_usecols(header: str) -> Tuple[int, ...]:
+    """
+    Map a CSV header line to the indices of CSV_COLUMNS. All rollout CSVs share the same
+    header, so this is only resolved once per process.
+    """
+    column_names = next(csv.reader([header]))
+    return tuple(column_names.index(col) for col in CSV_COLUMNS)
+
 def analyze_csv_file(csv_path: str) -> Dict:
     """Analyze a single CSV file and return summary statistics."""
     try:
-        df = pd.read_csv(csv_path)
+        # Load the needed columns straight into one typed array, no DataFrame needed
+        with open(csv_path, 'r', newline='') as f:
+            usecols = _csv_usecols(f.readline().rstrip('\r\n'))
+            data = np.loadtxt(f, delimiter=',', usecols=usecols, dtype=CSV_DTYPE, ndmin=2)
         
         # Basic statistics
-        n_runs = len(df)
-        success_rate = df['success'].mean()
-        mean_steps = df['n_steps'].mean()
-        total_critical_collisions = df['critical_collisions'].sum()
-        mean_critical_collisions = df['critical_collisions'].mean()
-        
-        return {
-            'n_runs': n_runs,
-            'success_rate': success_rate,
-            'mean_steps': mean_steps,
-            'total_critical_collisions': total_critical_collisions,
-            'mean_critical_collisions': mean_critical_collisions
-        }
+        return reduce_runs(data)
     
     except Exception as e:
         print(f"Error processing {csv_path}: {e}")
         return None
 
-def main():
+def iter_csvs(root: str, pattern: str = '*.csv') -> Iterator[Tuple[str, str]]:
+    """
+    Yield (dirpath, filename) for all CSV files below @root whose name matches @pattern,
+    skipping video directories. Uses os.walk on plain strings, which is much cheaper than
+    Path.rglob for large trees.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        if 'video' in dirpath:  # only possible if @root itself is (inside) a video directory
+            dirnames[:] = []
+            continue
+        # prune video directories in place so that os.walk doesn't descend into them at all
+        dirnames[:] = [d for d in dirnames if 'video' not in d]
+        for filename in filenames:
+            if filename.endswith('.csv') and 'video' not in filename and fnmatch.fnmatch(filename, pattern):
+                yield dirpath, filename
+
+def load_cache(cache_file: str) -> Dict[str, Tuple[int, Dict]]:
+    """
+    Load the per-file statistics cache written by @save_cache. Maps the path of each CSV
+    file (relative to the results directory) to its modification time in ns and its
+    statistics, as returned by analyze_csv_file.
+    """
+    if not os.path.exists(cache_file):
+        return {}
+    cache_df = pd.read_csv(cache_file, dtype={'path': str})
+    return {
+        path: (mtime_ns, dict(zip(STAT_KEYS, stats)))
+        for path, mtime_ns, *stats in cache_df[['path', 'mtime_ns'] + STAT_KEYS].itertuples(index=False)
+    }
+
+def save_cache(cache_file: str, cache: Dict[str, Tuple[int, Dict]]):
+    """Write the per-file statistics cache loaded by @load_cache."""
+    cache_columns = {'path': [], 'mtime_ns': []}
+    cache_columns.update({key: [] for key in STAT_KEYS})
+    for path, (mtime_ns, stats) in cache.items():
+        cache_columns['path'].append(path)
+        cache_columns['mtime_ns'].append(mtime_ns)
+        for key in STAT_KEYS:
+            cache_columns[key].append(stats[key])
+    pd.DataFrame(cache_columns).to_csv(cache_file, index=False)
+
+def make_result(environment: str, method_dir: str, filename: str, stats: Dict) -> Tuple[Tuple, Dict[str, str]]:
+    """
+    Create the result entry of a single experiment CSV from its location and statistics.
+    Returns a (row, params) pair, where row holds the values for RESULT_COLUMNS in order.
+    """
+    # Parse method and parameters from filename
+    method_name, params = parse_method_from_filename(filename)
+
+    row = (
+        environment.capitalize(),
+        method_dir,
+        method_name,
+        stats['mean_steps'],
+        stats['success_rate'],
+        stats['total_critical_collisions'],
+        stats['mean_critical_collisions'],
+        stats['n_runs'],
+    )
+    return row, params
+
+def summarize_by(summary_df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """
+    Aggregate SUMMARY_AGGREGATIONS over the methods in @summary_df, grouped by @key.
+    Only the aggregated columns are passed to the groupby, so the string and parameter
+    columns of the summary are not partitioned along with them.
+    """
+    columns = [key] + list(SUMMARY_AGGREGATIONS)
+    return summary_df[columns].groupby(key, observed=True).agg(SUMMARY_AGGREGATIONS).round(4)
+
+def main(args):
     """Main function to analyze all results and create summary."""
     
     # Base results directory
-    results_dir = Path("/home/jakob/Promotion/code/robomimic/results_selection")
+    results_dir = Path(args.results_dir)
     
     if not results_dir.exists():
         print(f"Results directory not found: {results_dir}")
         return
+
+    # If --since is given, only files modified at or after it are analyzed again, older files are
+    # taken from the cache as they are (and only analyzed if they are not cached yet)
+    since_ns = None
+    if args.since is not None:
+        since_ns = int(datetime.fromisoformat(args.since).timestamp() * 1e9)
+
+    # Statistics of previously analyzed files, only files changed since then are analyzed again
+    cache_file = args.cache_file if args.cache_file is not None else str(results_dir / CACHE_FILENAME)
+    cache = {} if args.no_cache else load_cache(cache_file)
     
-    # Collect all individual experiment results
-    individual_results = []
-    
-    # Walk through all CSV files in results directory
-    for csv_file in results_dir.rglob("*.csv"):
+    # Walk through all CSV files in results directory and collect the ones to process
+    items = []
+    for dirpath, filename in iter_csvs(str(results_dir), args.pattern):
         # Parse path to extract environment and method info
-        path_parts = csv_file.relative_to(results_dir).parts
+        path_parts = os.path.relpath(dirpath, results_dir).split(os.sep)
         
-        if len(path_parts) < 4:  # Should be: env/ph/method_dir/file.csv
+        if len(path_parts) < 3:  # Should be: env/ph/method_dir/file.csv
             continue
             
         environment = path_parts[0]  # e.g., 'lift'
         ph_dir = path_parts[1]       # Should be 'ph'
         method_dir = path_parts[2]   # e.g., 'failsafe_single'
-        filename = path_parts[3]     # e.g., 'PFL_Ta8_cf20.csv'
-        
-        # Skip video directories
-        if 'video' in str(csv_file):
-            continue
-            
-        # Parse method and parameters from filename
-        method_name, params = parse_method_from_filename(filename)
-        
-        # Analyze the CSV file
-        stats = analyze_csv_file(str(csv_file))
+        # filename, e.g., 'PFL_Ta8_cf20.csv'
+
+        csv_path = os.path.join(dirpath, filename)
+        mtime_ns = os.stat(csv_path).st_mtime_ns
+
+        items.append((environment, method_dir, filename, csv_path, mtime_ns))
+
+    # Forget cached files that are gone from the results directory. Only entries within the scope of
+    # this walk are dropped, files excluded by --pattern are kept for later runs.
+    seen_paths = {os.path.relpath(csv_path, results_dir) for *_, csv_path, _ in items}
+    stale_paths = [
+        path for path in cache
+        if path not in seen_paths and fnmatch.fnmatch(os.path.basename(path), args.pattern)
+    ]
+    for path in stale_paths:
+        del cache[path]
+
+    # Reuse cached statistics for unchanged files and analyze the rest
+    all_stats = [None] * len(items)
+    todo = []
+    for i, (_, _, _, csv_path, mtime_ns) in enumerate(items):
+        cached = cache.get(os.path.relpath(csv_path, results_dir))
+        if since_ns is not None:
+            is_unchanged = mtime_ns < since_ns
+        else:
+            is_unchanged = cached is not None and cached[0] == mtime_ns
+        if cached is not None and is_unchanged:
+            all_stats[i] = cached[1]
+        else:
+            todo.append(i)
+    print(f"Analyzing {len(todo)} CSV files ({len(items) - len(todo)} unchanged files loaded from cache)")
+
+    # Each CSV file is analyzed independently, so spread them across all cores. Files are handed
+    # to the workers in large batches (a few per worker) to keep the per-file dispatch overhead low.
+    if todo:
+        n_workers = os.cpu_count() or 1
+        chunksize = max(1, len(todo) // (4 * n_workers))
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            todo_paths = [items[i][3] for i in todo]
+            for i, stats in zip(todo, executor.map(analyze_csv_file, todo_paths, chunksize=chunksize)):
+                environment, method_dir, filename, csv_path, mtime_ns = items[i]
+                if stats is None:
+                    cache.pop(os.path.relpath(csv_path, results_dir), None)
+                    continue
+                all_stats[i] = stats
+                cache[os.path.relpath(csv_path, results_dir)] = (mtime_ns, stats)
+                print(f"Processed: {environment}/{method_dir}/{filename}")
+
+    # Only rewrite the cache if any of its entries changed
+    if not args.no_cache and (todo or stale_paths):
+        save_cache(cache_file, cache)
+
+    # Collect results column-wise, parameters are padded with NaN for methods that don't have them
+    result_columns = {col: [] for col in RESULT_COLUMNS}
+    param_values = {}
+    n_results = 0
+    for (environment, method_dir, filename, _, _), stats in zip(items, all_stats):
         if stats is None:
             continue
-        
-        # Create result entry
-        result = {
-            'Environment': environment.capitalize(),
-            'Method_Dir': method_dir,
-            'Method': method_name,
-            'Horizon': stats['mean_steps'],
-            'Success_Rate': stats['success_rate'],
-            'N_Critical_Collisions': stats['total_critical_collisions'],
-            'Mean_Critical_Collisions': stats['mean_critical_collisions'],
-            'N_Runs': stats['n_runs'],
-        }
-        
-        # Add parameter information
-        for param_name, param_value in params.items():
-            result[f'Param_{param_name}'] = param_value
-            
-        individual_results.append(result)
-        print(f"Processed: {environment}/{method_dir}/{filename}")
+        row, params = make_result(environment, method_dir, filename, stats)
+        # intern the (highly repetitive) strings to share one object per distinct value
+        for col, value in zip(RESULT_COLUMNS, row):
+            result_columns[col].append(sys.intern(value) if isinstance(value, str) else value)
+        for param_name in params:
+            if param_name not in param_values:
+                param_values[param_name] = [np.nan] * n_results
+        for param_name, values in param_values.items():
+            values.append(sys.intern(params[param_name]) if param_name in params else np.nan)
+        n_results += 1
     
-    if not individual_results:
+    if n_results == 0:
         print("No CSV files found to process!")
         return
     
     # Convert to DataFrame - each CSV file is one method
-    summary_df = pd.DataFrame(individual_results)
+    param_columns = []
+    for param_name, values in param_values.items():
+        param_columns.append(f'Param_{param_name}')
+        result_columns[param_columns[-1]] = values
+    summary_df = pd.DataFrame(result_columns)
+    summary_df = summary_df.astype({col: 'category' for col in CATEGORICAL_COLUMNS})
     
     # Create a more descriptive method name that includes parameters
-    summary_df['Method_Full'] = summary_df.apply(lambda row: 
-        row['Method'] + ('_' + '_'.join([f"{k.replace('Param_', '')}{v}" 
-                                       for k, v in row.items() 
-                                       if k.startswith('Param_')]) if any(row.index.str.startswith('Param_')) else ''), 
-        axis=1)
+    # (e.g. PFL with Param_Ta=8, Param_cf=20 -> PFL_Ta8_cf20)
+    if param_columns:
+        # methods without a parameter have NaN for it and get no suffix for it
+        param_suffixes = [summary_df[col].radd('_' + col[len('Param_'):]) for col in param_columns]
+        summary_df['Method_Full'] = summary_df['Method'].str.cat(param_suffixes, na_rep='')
+    else:
+        summary_df['Method_Full'] = summary_df['Method']
     
     # Sort by Environment, Method, then Method_Full for better readability
     summary_df = summary_df.sort_values(['Environment', 'Method', 'Method_Full'])
@@ -134,20 +329,23 @@ def main():
     # Reorder columns for the requested format
     base_columns = ['Environment', 'Method', 'Method_Full', 'Horizon', 'Success_Rate', 'N_Critical_Collisions']
     additional_columns = ['Mean_Critical_Collisions', 'Method_Dir', 'N_Runs']
-    param_columns = [col for col in summary_df.columns if col.startswith('Param_')]
     
     final_columns = base_columns + additional_columns + param_columns
-    summary_df = summary_df[final_columns]
     
-    # Round final values appropriately
-    summary_df['Horizon'] = summary_df['Horizon'].round(0).astype(int)
-    summary_df['Success_Rate'] = summary_df['Success_Rate'].round(4)
-    summary_df['N_Critical_Collisions'] = summary_df['N_Critical_Collisions'].round(0).astype(int)
-    summary_df['Mean_Critical_Collisions'] = summary_df['Mean_Critical_Collisions'].round(2)
-    summary_df['N_Runs'] = summary_df['N_Runs'].astype(int)
+    # Round final values appropriately, in one pass over the selected columns
+    summary_df = summary_df[final_columns].round({
+        'Horizon': 0,
+        'Success_Rate': 4,
+        'N_Critical_Collisions': 0,
+        'Mean_Critical_Collisions': 2,
+    }).astype({
+        'Horizon': int,
+        'N_Critical_Collisions': int,
+        'N_Runs': int,
+    })
     
     # Save summary
-    output_file = results_dir / "experiment_summary.csv"
+    output_file = args.output if args.output is not None else results_dir / "experiment_summary.csv"
     summary_df.to_csv(output_file, index=False)
     
     print(f"\nSummary saved to: {output_file}")
@@ -155,24 +353,76 @@ def main():
     
     # Display summary statistics
     print("\nSummary by Environment:")
-    env_summary = summary_df.groupby('Environment').agg({
-        'Success_Rate': ['count', 'mean', 'std'],
-        'Horizon': ['mean', 'std'],
-        'N_Critical_Collisions': ['mean', 'std']
-    }).round(4)
-    print(env_summary)
+    print(summarize_by(summary_df, 'Environment'))
     
     print("\nSummary by Method:")
-    method_summary = summary_df.groupby('Method').agg({
-        'Success_Rate': ['count', 'mean', 'std'], 
-        'Horizon': ['mean', 'std'],
-        'N_Critical_Collisions': ['mean', 'std']
-    }).round(4)
-    print(method_summary)
+    print(summarize_by(summary_df, 'Method'))
     
-    # Show all rows of the summary
-    print("\nComplete Summary (all methods):")
-    print(summary_df.to_string(index=False))
+    # Show all rows of the summary if requested, otherwise only the first few
+    if args.print_all:
+        print("\nComplete Summary (all methods):")
+        print(summary_df.to_string(index=False))
+    else:
+        print(f"\nSummary (first {min(N_PREVIEW_ROWS, len(summary_df))} methods, use --print_all to show all):")
+        print(summary_df.head(N_PREVIEW_ROWS).to_string(index=False))
+        if len(summary_df) > N_PREVIEW_ROWS:
+            print(f"... ({len(summary_df) - N_PREVIEW_ROWS} more rows, see {output_file})")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+
+    # root of the results tree, laid out as env/ph/method_dir/file.csv
+    parser.add_argument(
+        "--results_dir",
+        type=str,
+        default="/home/jakob/Promotion/code/robomimic/results_selection",
+        help="path to results directory, laid out as env/ph/method_dir/file.csv",
+    )
+
+    # restrict the analysis to a subset of the experiment files
+    parser.add_argument(
+        "--pattern",
+        type=str,
+        default="*.csv",
+        help="(optional) only analyze CSV files whose name matches this glob pattern, e.g. 'PFL_*.csv'",
+    )
+
+    parser.add_argument(
+        "--since",
+        type=str,
+        default=None,
+        help="(optional) only analyze CSV files modified at or after this ISO timestamp (e.g. 2025-06-01T12:00)\
+            again, older files are taken from the cache without checking their modification time. All files\
+            are still included in the summary",
+    )
+
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="(optional) path of the summary CSV (by default, experiment_summary.csv in the results directory)",
+    )
+
+    # cache of per-file statistics, so that only new or modified files are analyzed on re-runs
+    parser.add_argument(
+        "--cache_file",
+        type=str,
+        default=None,
+        help="(optional) path of the per-file statistics cache (by default, {} in the results directory)".format(CACHE_FILENAME),
+    )
+
+    parser.add_argument(
+        "--no_cache",
+        action='store_true',
+        help="analyze all CSV files again and do not read or write the per-file statistics cache",
+    )
+
+    # print the complete summary table instead of only the first rows
+    parser.add_argument(
+        "--print_all",
+        action='store_true',
+        help="print all rows of the summary (by default, only the first few rows are printed)",
+    )
+
+    args = parser.parse_args()
+    main(args)
\ No newline at end of file
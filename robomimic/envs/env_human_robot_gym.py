@@ -1,3 +1,5 @@
+import functools
+import json
 from robomimic.envs.env_base import EnvBase, EnvType
 import robosuite as suite
 # from robosuite.wrappers import GymWrapper
@@ -15,6 +17,62 @@ import robomimic.utils.lang_utils as LangUtils
 import robosuite
 
 
+@functools.lru_cache(maxsize=64)
+def _get_cached_lang_emb(lang):
+    """
+    Language embeddings are expensive to compute, so share them across environments
+    created with the same language instruction. The returned embedding must not be modified.
+    """
+    return LangUtils.get_lang_emb(lang)
+
+
+# first valid EGL rendering device, or -1 if there is none (None until probed)
+_RENDER_GPU_DEVICE_ID = None
+
+
+def _get_render_gpu_device_id():
+    """
+    Probe the available EGL devices once per process, since enumerating them is slow.
+    Returns the id of the first valid device, or -1 if no device is available.
+    """
+    global _RENDER_GPU_DEVICE_ID
+    if _RENDER_GPU_DEVICE_ID is None:
+        # NOTE: this package should be installed from this link (https://github.com/StanfordVL/egl_probe)
+        import egl_probe
+        valid_gpu_devices = egl_probe.get_available_devices()
+        _RENDER_GPU_DEVICE_ID = valid_gpu_devices[0] if len(valid_gpu_devices) > 0 else -1
+    return _RENDER_GPU_DEVICE_ID
+
+
+@functools.lru_cache(maxsize=None)
+def _file_path_completion(path):
+    """Cached version of @file_path_completion for the constant asset and config paths."""
+    return file_path_completion(path)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_controller_configs(shield_type):
+    """
+    Load the failsafe controller config for @shield_type and merge the robot-specific
+    limits into it. This only depends on files on disk, so it is done once per process.
+    Callers should deepcopy the result before modifying it.
+    """
+    robot_config_path = _file_path_completion("models/robots/config/panda.json")
+    if shield_type == "CBF":
+        failsafe_config_path = _file_path_completion("controllers/failsafe_controller/config/cbf_failsafe.json")
+    else:
+        failsafe_config_path = _file_path_completion("controllers/failsafe_controller/config/failsafe.json")
+    with open(failsafe_config_path, 'r') as f:
+        failsafe_config = json.load(f)
+    # Load robot-specific limits
+    with open(robot_config_path, 'r') as f:
+        robot_config = json.load(f)
+    # Merge robot limits into failsafe config
+    controller_config = {'body_parts': {'right': {}}}
+    controller_config['body_parts']['right'] = merge_configs(failsafe_config['body_parts']['right'], robot_config)
+    return [controller_config]
+
+
 class EnvHumanRobotGym(EnvRobosuite):
     """A wrapper for Human-Robot Gym environments."""
     def __init__(
@@ -34,7 +92,10 @@ class EnvHumanRobotGym(EnvRobosuite):
         if self._is_v1:
             assert (int(robosuite.__version__.split(".")[1]) >= 2), "only support robosuite v0.3 and v1.2+"
 
-        kwargs = deepcopy(kwargs)
+        # only the controller configs are modified downstream, so avoid deep-copying all kwargs
+        kwargs = dict(kwargs)
+        if "controller_configs" in kwargs:
+            kwargs["controller_configs"] = deepcopy(kwargs["controller_configs"])
 
         # update kwargs based on passed arguments
         update_kwargs = dict(
@@ -52,11 +113,9 @@ class EnvHumanRobotGym(EnvRobosuite):
         if self._is_v1:
             if kwargs["has_offscreen_renderer"]:
                 # ensure that we select the correct GPU device for rendering by testing for EGL rendering
-                # NOTE: this package should be installed from this link (https://github.com/StanfordVL/egl_probe)
-                import egl_probe
-                valid_gpu_devices = egl_probe.get_available_devices()
-                if len(valid_gpu_devices) > 0:
-                    kwargs["render_gpu_device_id"] = valid_gpu_devices[0]
+                gpu_device_id = _get_render_gpu_device_id()
+                if gpu_device_id >= 0:
+                    kwargs["render_gpu_device_id"] = gpu_device_id
         else:
             # make sure gripper visualization is turned off (we almost always want this for learning)
             kwargs["gripper_visualization"] = False
@@ -68,7 +127,7 @@ class EnvHumanRobotGym(EnvRobosuite):
         self._init_kwargs = deepcopy(kwargs)
         self.env = self._create_safe_env(env_name, **kwargs)
         self.lang = lang
-        self._lang_emb = LangUtils.get_lang_emb(self.lang)
+        self._lang_emb = _get_cached_lang_emb(self.lang)
 
     def _create_safe_env(self, env_name, **kwargs):
         use_failsafe_controller = kwargs.get("use_failsafe_controller", True)
@@ -76,26 +135,17 @@ class EnvHumanRobotGym(EnvRobosuite):
         n_waypoints = kwargs.get("n_waypoints", 1)
         shield_type = kwargs.get("shield_type", "OFF")
 
-        original_controller_config = deepcopy(kwargs["controller_configs"])
         if use_failsafe_controller:
-            pybullet_urdf_file = file_path_completion("models/assets/robots/panda/panda_with_gripper.urdf") 
-            robot_config_path = file_path_completion("models/robots/config/panda.json")
-            import json
-            if shield_type == "CBF":
-                failsafe_config_path = file_path_completion("controllers/failsafe_controller/config/cbf_failsafe.json")
-            else:
-                failsafe_config_path = file_path_completion("controllers/failsafe_controller/config/failsafe.json")
-            with open(failsafe_config_path, 'r') as f:
-                failsafe_config = json.load(f)
-            # Load robot-specific limits
-            with open(robot_config_path, 'r') as f:
-                robot_config = json.load(f)
-            # Merge robot limits into failsafe config
-            controller_config = {'body_parts': {'right': {}}}
-            controller_config['body_parts']['right'] = merge_configs(failsafe_config['body_parts']['right'], robot_config)
-            controller_configs = [controller_config]
+            # the passed controller config only defines the action limits of the IK wrappers below
+            # (it was already copied in __init__, so no need to copy it again here)
+            right_arm_config = kwargs["controller_configs"]['body_parts']['right']
+            output_min = right_arm_config.get('output_min', [-0.05, -0.05, -0.05, -0.5, -0.5, -0.5])
+            output_max = right_arm_config.get('output_max', [0.05, 0.05, 0.05, 0.5, 0.5, 0.5])
+            use_orientation = right_arm_config.get('input_type', "delta") == "delta"
+            # copy the cached config since the environment may modify it
+            controller_configs = deepcopy(_load_controller_configs(shield_type))
         else:
-            controller_configs = original_controller_config
+            controller_configs = kwargs["controller_configs"]
             if use_waypoints_action:
                 raise NotImplementedError("Waypoint actions require the failsafe controller.")
 
@@ -129,29 +179,23 @@ class EnvHumanRobotGym(EnvRobosuite):
         )
 
         if use_failsafe_controller:
-            pybullet_urdf_file = file_path_completion(
+            pybullet_urdf_file = _file_path_completion(
                 "models/assets/robots/panda/panda_with_gripper.urdf"
             )
             if use_waypoints_action:
                 env = IKWayPointsDeltaWrapper(
                     env=env,
                     urdf_file=pybullet_urdf_file,
-                    action_limits=[
-                        original_controller_config['body_parts']['right'].get('output_min', [-0.05, -0.05, -0.05, -0.5, -0.5, -0.5]),
-                        original_controller_config['body_parts']['right'].get('output_max', [0.05, 0.05, 0.05, 0.5, 0.5, 0.5])
-                    ],
-                    use_orientation=original_controller_config['body_parts']['right'].get('input_type', "delta")=="delta",
+                    action_limits=[output_min, output_max],
+                    use_orientation=use_orientation,
                     n_waypoints=n_waypoints
                 )
             else:
                 env = IKPositionDeltaWrapper(
                     env=env,
                     urdf_file=pybullet_urdf_file,
-                    action_limits=[
-                        original_controller_config['body_parts']['right'].get('output_min', [-0.05, -0.05, -0.05, -0.5, -0.5, -0.5]),
-                        original_controller_config['body_parts']['right'].get('output_max', [0.05, 0.05, 0.05, 0.5, 0.5, 0.5])
-                    ],
-                    use_orientation=original_controller_config['body_parts']['right'].get('input_type', "delta")=="delta"
+                    action_limits=[output_min, output_max],
+                    use_orientation=use_orientation
                 )
 
         return env